@@ -8,7 +8,7 @@ from collections import defaultdict
 
 from apulian.models import Vase, Painter, Location, Image, Side, Theme, \
         Instrument, InstrumentInstance, Figure
-from apulian.utils import take_digits
+from apulian.utils import parse_trendall, take_digits
 
 
 class RowAdapter:
@@ -71,10 +71,7 @@ class RowAdapter:
         return objects
 
     def _parse_trendall(self, trendall_id):
-        trendall_ch, trendall_no = trendall_id.split('.')
-        trendall_ch = int(trendall_ch)
-        trendall_no = trendall_no.strip()
-        return (trendall_ch, trendall_no)
+        return parse_trendall(trendall_id)
 
     def _parse_images(self, image_str):
         numbers = set()
@@ -0,0 +1,242 @@
+
+"""\
+Streaming, denormalized exports of the database.
+
+Each record is one flat row (a side or an instrument instance) with the vase,
+painter, and location columns folded in. The rows come straight out of a
+single joined query iterated with `yield_per`, so the ORM never builds up the
+whole object graph in the session. The queries are ordered by the table they
+scan, so SQLite can return rows without sorting the whole result first.
+"""
+
+__all__ = [
+    'RECORD_TYPES',
+    'FORMATS',
+    'side_query',
+    'instrument_query',
+    'iter_records',
+    'write_jsonl',
+    'write_csv',
+    'open_output',
+    'export',
+    ]
+
+
+import csv
+import gzip
+import json
+import sys
+
+from sqlalchemy import func
+
+from apulian.models import Vase, Painter, Location, Side, Theme, \
+        Instrument, InstrumentInstance, side_theme, instance_theme
+
+
+CHUNK_SIZE = 1000
+
+
+def _vase_columns():
+    """The vase, painter, and location columns shared by every record."""
+    return [
+        Vase.id.label('vase_id'),
+        Vase.trendall_ch.label('trendall_ch'),
+        Vase.trendall_no.label('trendall_no'),
+        Vase.fabric.label('fabric'),
+        Vase.form.label('form'),
+        Vase.subform.label('subform'),
+        Vase.produced_start.label('produced_start'),
+        Vase.produced_end.label('produced_end'),
+        Vase.provenience.label('provenience'),
+        Painter.name.label('painter'),
+        Location.city_name.label('city_name'),
+        Location.collection_name.label('collection_name'),
+        Location.collection_id.label('collection_id'),
+        ]
+
+
+def _themes_column(session, secondary, key):
+    """\
+    A correlated subquery collapsing the themes linked through the `secondary`
+    table into one comma-separated column. Doing this per row, instead of
+    grouping the whole join, lets SQLite stream the rows in scan order.
+    """
+    return (
+        session.query(func.group_concat(Theme.name))
+        .filter(secondary.c.theme_id == Theme.id)
+        .filter(key)
+        .as_scalar()
+        .label('themes')
+        )
+
+
+def side_query(session):
+    """\
+    Returns a query with one row per side. The side's themes are collapsed
+    into one comma-separated column.
+    """
+    columns = _vase_columns() + [
+        Side.id.label('side_id'),
+        Side.identifier.label('side'),
+        Side.composition.label('composition'),
+        Side.details.label('details'),
+        _themes_column(session, side_theme, side_theme.c.side_id == Side.id),
+        ]
+    return (
+        session.query(*columns)
+        .select_from(Side)
+        .join(Vase, Side.vase)
+        .outerjoin(Painter, Vase.painter)
+        .outerjoin(Location, Vase.location)
+        .order_by(Side.id)
+        )
+
+
+def instrument_query(session):
+    """\
+    Returns a query with one row per instrument instance, including the side
+    it is on and its themes, collapsed into one comma-separated column.
+    """
+    columns = _vase_columns() + [
+        Side.id.label('side_id'),
+        Side.identifier.label('side'),
+        InstrumentInstance.id.label('instrument_instance_id'),
+        Instrument.name.label('instrument'),
+        InstrumentInstance.performer.label('performer'),
+        InstrumentInstance.location.label('performer_location'),
+        InstrumentInstance.action.label('performer_action'),
+        _themes_column(
+            session, instance_theme,
+            instance_theme.c.instrument_instance_id == InstrumentInstance.id,
+            ),
+        ]
+    return (
+        session.query(*columns)
+        .select_from(InstrumentInstance)
+        .join(Side, InstrumentInstance.side)
+        .join(Vase, Side.vase)
+        .outerjoin(Instrument, InstrumentInstance.instrument)
+        .outerjoin(Painter, Vase.painter)
+        .outerjoin(Location, Vase.location)
+        .order_by(InstrumentInstance.id)
+        )
+
+
+RECORD_TYPES = {
+    'side': side_query,
+    'instrument': instrument_query,
+    }
+
+
+def iter_records(session, record_type, chunk_size=CHUNK_SIZE):
+    """\
+    Iterates over the records of the given type as dicts, fetching them from
+    the database `chunk_size` rows at a time.
+
+    >>> from apulian.models import bootstrap, Painter, Instrument
+    >>> session = bootstrap('sqlite://')()
+    >>> dancing, procession = Theme(name='DANCING'), Theme(name='PROCESSION')
+    >>> vase = Vase(trendall_ch=1, trendall_no='01', painter=Painter(name='P'))
+    >>> vase.sides = [Side(identifier='A', themes=[dancing, procession]),
+    ...               Side(identifier='B')]
+    >>> session.add(InstrumentInstance(
+    ...     side=vase.sides[0], instrument=Instrument(name='AU'),
+    ...     performer='M', themes=[dancing, procession]))
+    >>> session.commit()
+
+    Vases without a location and sides without themes get None.
+
+    >>> for record in iter_records(session, 'side'):
+    ...     print(record['side'], record['painter'], record['city_name'],
+    ...           sorted((record['themes'] or '').split(',')))
+    A P None ['DANCING', 'PROCESSION']
+    B P None ['']
+    >>> [record] = iter_records(session, 'instrument')
+    >>> (record['side'], record['instrument'], record['performer'],
+    ...  sorted(record['themes'].split(',')))
+    ('A', 'AU', 'M', ['DANCING', 'PROCESSION'])
+
+    """
+    query = RECORD_TYPES[record_type](session)
+    for row in query.yield_per(chunk_size):
+        yield row._asdict()
+
+
+def _field_names(session, record_type):
+    query = RECORD_TYPES[record_type](session)
+    return [desc['name'] for desc in query.column_descriptions]
+
+
+def write_jsonl(records, fout):
+    """\
+    Writes each record as one JSON object per line. Returns the count.
+
+    >>> import io
+    >>> fout = io.StringIO()
+    >>> write_jsonl([{'side': 'A', 'vase_id': 1}], fout)
+    1
+    >>> fout.getvalue()
+    '{"side": "A", "vase_id": 1}\\n'
+
+    """
+    n = 0
+    for record in records:
+        fout.write(json.dumps(record, sort_keys=True))
+        fout.write('\n')
+        n += 1
+    return n
+
+
+def write_csv(records, fout, fieldnames):
+    """\
+    Writes the records as CSV with a header row. Returns the count.
+
+    >>> import io
+    >>> fout = io.StringIO()
+    >>> write_csv([{'side': 'A', 'vase_id': 1}], fout, ['vase_id', 'side'])
+    1
+    >>> fout.getvalue()
+    'vase_id,side\\r\\n1,A\\r\\n'
+
+    """
+    writer = csv.DictWriter(fout, fieldnames=fieldnames)
+    writer.writeheader()
+    n = 0
+    for record in records:
+        writer.writerow(record)
+        n += 1
+    return n
+
+
+FORMATS = ('jsonl', 'csv')
+
+
+def open_output(filename, compress=False):
+    """\
+    Opens the output file for writing text. A filename of '-' writes to
+    STDOUT. If `compress` is True, or the filename ends in '.gz', the output
+    is gzipped.
+    """
+    if filename == '-':
+        if compress:
+            return gzip.open(
+                sys.stdout.buffer, 'wt', encoding='utf8', newline='',
+                )
+        return open(sys.stdout.fileno(), 'w', encoding='utf8', newline='',
+                    closefd=False)
+    if compress or filename.endswith('.gz'):
+        return gzip.open(filename, 'wt', encoding='utf8', newline='')
+    return open(filename, 'w', encoding='utf8', newline='')
+
+
+def export(session, record_type, fmt, fout, chunk_size=CHUNK_SIZE):
+    """\
+    Streams the records of `record_type` from the session to `fout` in the
+    format `fmt`. Returns the number of records written.
+    """
+    records = iter_records(session, record_type, chunk_size)
+    if fmt == 'jsonl':
+        return write_jsonl(records, fout)
+    elif fmt == 'csv':
+        return write_csv(records, fout, _field_names(session, record_type))
+    raise ValueError('Invalid export format: "{}"'.format(fmt))
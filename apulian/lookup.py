@@ -0,0 +1,230 @@
+
+"""\
+Bulk lookups of vases by Trendall ID or image number.
+
+The inputs are parsed and normalized once, then resolved in chunks of
+IN-queries with the rest of the vase graph eagerly loaded, so resolving
+thousands of IDs takes a handful of queries instead of one per ID.
+"""
+
+__all__ = [
+    'normalize_trendall_ids',
+    'normalize_image_numbers',
+    'lookup_trendall_ids',
+    'lookup_image_numbers',
+    ]
+
+
+from collections import defaultdict
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload, subqueryload
+
+from apulian.models import Vase, Image, Side, InstrumentInstance
+from apulian.utils import parse_trendall
+
+
+# This keeps each IN-query under SQLite's default limit of 999 bound
+# parameters.
+CHUNK_SIZE = 400
+
+
+def _chunks(items, size):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _vase_options():
+    """The eager loading options to pull in the whole vase graph."""
+    sides = subqueryload(Vase.sides)
+    instruments = sides.subqueryload(Side.instruments)
+    return [
+        joinedload(Vase.painter),
+        joinedload(Vase.location),
+        subqueryload(Vase.images),
+        sides.subqueryload(Side.themes),
+        sides.subqueryload(Side.figures),
+        instruments.joinedload(InstrumentInstance.instrument),
+        instruments.subqueryload(InstrumentInstance.themes),
+        ]
+
+
+def normalize_trendall_ids(trendall_ids):
+    """\
+    Parses each Trendall ID once. This returns a dict mapping each input ID
+    to its `(trendall_ch, trendall_no)` key, or to None if it can't be
+    parsed. The inputs are the dict's keys, so they must be hashable.
+
+    >>> inputs = ['04.95', ' 04.210b', '4.', 'nope', None]
+    >>> keys = normalize_trendall_ids(inputs)
+    >>> [keys[k] for k in inputs]
+    [(4, '95'), (4, '210b'), None, None, None]
+
+    """
+    keys = {}
+    for trendall_id in trendall_ids:
+        if trendall_id in keys:
+            continue
+        try:
+            keys[trendall_id] = parse_trendall(trendall_id.strip())
+        except (AttributeError, ValueError):
+            keys[trendall_id] = None
+    return keys
+
+
+def normalize_image_numbers(image_numbers):
+    """\
+    Normalizes each image number, given as an int or a string, to the form
+    stored in `Image.name`. This returns a dict mapping each input to its
+    name, or to None if it isn't a whole number. The inputs are the dict's
+    keys, so they must be hashable.
+
+    >>> inputs = [5975, '05976 ', 5977.0, 3.7, 'IMAG5977.jpg', None]
+    >>> names = normalize_image_numbers(inputs)
+    >>> [names[k] for k in inputs]
+    ['5975', '5976', '5977', None, None, None]
+
+    """
+    names = {}
+    for image_number in image_numbers:
+        if image_number in names:
+            continue
+        if isinstance(image_number, float) and not image_number.is_integer():
+            names[image_number] = None
+            continue
+        try:
+            names[image_number] = str(int(image_number))
+        except (TypeError, ValueError):
+            names[image_number] = None
+    return names
+
+
+def lookup_trendall_ids(session, trendall_ids, chunk_size=CHUNK_SIZE):
+    """\
+    Resolves many Trendall IDs (e.g., "04.95" or "04.210b") to vases at
+    once. This returns a dict mapping each input ID to the list of vases with
+    that ID. The list is empty for IDs that are unknown or can't be parsed.
+
+    >>> from apulian.models import bootstrap, Painter, Instrument
+    >>> make_session = bootstrap('sqlite://')
+    >>> session = make_session()
+    >>> side = Side(identifier='A', instruments=[
+    ...     InstrumentInstance(instrument=Instrument(name='AU'))])
+    >>> session.add_all([
+    ...     Vase(id=1, trendall_ch=4, trendall_no='95',
+    ...          painter=Painter(name='P'), sides=[side],
+    ...          images=[Image(name='10'), Image(name='11')]),
+    ...     Vase(id=2, trendall_ch=4, trendall_no='210b',
+    ...          images=[Image(name='12')]),
+    ...     Vase(id=3, trendall_ch=5, trendall_no='95',
+    ...          images=[Image(name='12')]),
+    ...     Vase(id=4, trendall_ch=5, trendall_no='95'),
+    ...     ])
+    >>> session.commit()
+    >>> session.close()
+
+    The IDs span two chapters and, with a `chunk_size` of 2, three chunks.
+
+    >>> vases = lookup_trendall_ids(session, [
+    ...     '04.95', '4.95', '04.210b', '05.95', '04.1', '4.', 'nope'],
+    ...     chunk_size=2)
+    >>> session.close()
+    >>> for (trendall_id, found) in vases.items():
+    ...     print(repr(trendall_id), [vase.id for vase in found])
+    '04.95' [1]
+    '4.95' [1]
+    '04.210b' [2]
+    '05.95' [3, 4]
+    '04.1' []
+    '4.' []
+    'nope' []
+
+    The rest of the graph is loaded, even with the session closed.
+
+    >>> vase = vases['04.95'][0]
+    >>> (vase.painter.name, [image.name for image in vase.images],
+    ...  vase.sides[0].instruments[0].instrument.name)
+    ('P', ['10', '11'], 'AU')
+
+    """
+    keys = normalize_trendall_ids(trendall_ids)
+
+    wanted = sorted(set(key for key in keys.values() if key is not None))
+
+    found = defaultdict(list)
+    for chunk in _chunks(wanted, chunk_size):
+        by_chapter = defaultdict(list)
+        for (trendall_ch, trendall_no) in chunk:
+            by_chapter[trendall_ch].append(trendall_no)
+
+        query = (
+            session.query(Vase)
+            .options(*_vase_options())
+            .filter(or_(*[
+                and_(Vase.trendall_ch == trendall_ch,
+                     Vase.trendall_no.in_(trendall_nos))
+                for (trendall_ch, trendall_nos) in by_chapter.items()
+                ]))
+            .order_by(Vase.id)
+            )
+        for vase in query:
+            found[(vase.trendall_ch, vase.trendall_no)].append(vase)
+
+    return {
+        trendall_id: list(found.get(key, [])) if key is not None else []
+        for (trendall_id, key) in keys.items()
+        }
+
+
+def lookup_image_numbers(session, image_numbers, chunk_size=CHUNK_SIZE):
+    """\
+    Resolves many image numbers to the vases they picture at once. This
+    returns a dict mapping each input number to the list of vases with that
+    image. The list is empty for numbers that are unknown or invalid.
+
+    >>> from apulian.models import bootstrap
+    >>> make_session = bootstrap('sqlite://')
+    >>> session = make_session()
+    >>> session.add_all([
+    ...     Vase(id=1, images=[Image(name='10'), Image(name='11')]),
+    ...     Vase(id=2, images=[Image(name='12')]),
+    ...     Vase(id=3, images=[Image(name='12')]),
+    ...     ])
+    >>> session.commit()
+    >>> session.close()
+    >>> vases = lookup_image_numbers(
+    ...     session, [10, '11', '012', 13, 'x'], chunk_size=2)
+    >>> session.close()
+    >>> for (image_number, found) in vases.items():
+    ...     print(repr(image_number), [vase.id for vase in found],
+    ...           [len(vase.images) for vase in found])
+    10 [1] [2]
+    '11' [1] [2]
+    '012' [2, 3] [1, 1]
+    13 [] []
+    'x' [] []
+
+    """
+    names = normalize_image_numbers(image_numbers)
+
+    wanted = sorted(set(name for name in names.values() if name is not None))
+
+    found = defaultdict(list)
+    for chunk in _chunks(wanted, chunk_size):
+        query = (
+            session.query(Vase)
+            .options(*_vase_options())
+            .filter(Vase.images.any(Image.name.in_(chunk)))
+            .order_by(Vase.id)
+            )
+        chunk = set(chunk)
+        for vase in query:
+            for image in vase.images:
+                if image.name in chunk:
+                    found[image.name].append(vase)
+
+    return {
+        image_number: list(found.get(name, [])) if name is not None else []
+        for (image_number, name) in names.items()
+        }
@@ -5,6 +5,8 @@ Data models
 
 __all__ = [
     'bootstrap',
+    'bootstrap_writer',
+    'bootstrap_readers',
     'Vase',
     'Painter',
     'Location',
@@ -17,10 +19,15 @@ __all__ = [
     ]
 
 
+import os
+import sqlite3
+from urllib.request import pathname2url
+
 import sqlalchemy
-from sqlalchemy import Column, Integer, String, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, ForeignKey, Table, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, scoped_session, relationship
+from sqlalchemy.pool import QueuePool
 
 
 Base = declarative_base()
@@ -225,3 +232,82 @@ def bootstrap(uri, **kwargs):
     engine = sqlalchemy.create_engine(uri, **kwargs)
     Base.metadata.create_all(engine)
     return sessionmaker(bind=engine)
+
+
+# How long (in seconds) a connection waits on a lock before giving up.
+BUSY_TIMEOUT = 30
+
+
+def _sqlite_creator(filename, mode=None, immutable=False):
+    """\
+    This returns a function that opens a connection to the SQLite file using
+    a URI, so that it can be opened read-only or immutable. The connections
+    are handed between threads by the pool, never shared at the same time.
+    """
+    uri = 'file:{}'.format(pathname2url(os.path.abspath(filename)))
+    params = []
+    if mode is not None:
+        params.append('mode={}'.format(mode))
+    if immutable:
+        params.append('immutable=1')
+    if params:
+        uri += '?' + '&'.join(params)
+
+    def connect():
+        return sqlite3.connect(
+            uri, uri=True, timeout=BUSY_TIMEOUT, check_same_thread=False,
+            )
+
+    return connect
+
+
+def bootstrap_writer(filename, **kwargs):
+    """\
+    This bootstraps the ORM system for the one process writing to the SQLite
+    file. The database is switched to WAL journaling, so readers from
+    `bootstrap_readers` aren't blocked while it writes.
+
+    The engine's pool holds a single connection, so there is only ever one
+    writer. A session holds that connection from its first query until it
+    commits, rolls back, or closes. While it does, a second session trying to
+    write waits for it and raises `sqlalchemy.exc.TimeoutError` if it doesn't get the
+    connection within `pool_timeout` seconds (30 by default).
+    """
+    engine = sqlalchemy.create_engine(
+        'sqlite://',
+        creator=_sqlite_creator(filename, mode='rwc'),
+        poolclass=QueuePool, pool_size=1, max_overflow=0,
+        **kwargs
+        )
+
+    @event.listens_for(engine, 'connect')
+    def set_wal(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.close()
+
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+def bootstrap_readers(filename, pool_size=8, immutable=False, **kwargs):
+    """\
+    This bootstraps the ORM system for many threads reading from the SQLite
+    file and returns a thread-scoped `Session`. Each thread gets its own
+    session, and with it its own read-only connection from the pool. Call
+    `Session.remove()` when a thread is done with its session.
+
+    The file needs to be in WAL mode, as `bootstrap_writer` leaves it, for
+    readers to run alongside a writer. Otherwise SQLite falls back to
+    rollback-journal locking, and reads and writes block each other.
+
+    If `immutable` is True, SQLite skips locking entirely. Only use that when
+    nothing is writing to the file.
+    """
+    engine = sqlalchemy.create_engine(
+        'sqlite://',
+        creator=_sqlite_creator(filename, mode='ro', immutable=immutable),
+        poolclass=QueuePool, pool_size=pool_size, max_overflow=0,
+        **kwargs
+        )
+    return scoped_session(sessionmaker(bind=engine))
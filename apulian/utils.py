@@ -43,6 +43,29 @@ def take_digits(inp):
     return (num, rest)
 
 
+def parse_trendall(trendall_id):
+    """\
+    This parses a Trendall ID into its chapter number and the number within
+    the chapter.
+
+    >>> parse_trendall('04.95')
+    (4, '95')
+    >>> parse_trendall('04.210b ')
+    (4, '210b')
+    >>> parse_trendall('4.')
+    Traceback (most recent call last):
+      ...
+    ValueError: Missing Trendall number: "4."
+
+    """
+    trendall_ch, trendall_no = trendall_id.split('.')
+    trendall_ch = int(trendall_ch)
+    trendall_no = trendall_no.strip()
+    if not trendall_no:
+        raise ValueError('Missing Trendall number: "{}"'.format(trendall_id))
+    return (trendall_ch, trendall_no)
+
+
 def read_csv(filename):
     """This reads the CSV files. """
     with open(filename, encoding='latin1') as fin:
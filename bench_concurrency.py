@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+
+
+"""\
+This stress tests concurrent reads. For each thread count, it copies the
+database to a temporary file, then has that many threads running read queries
+through `bootstrap_readers` while another thread keeps importing vases through
+`bootstrap_writer`. It prints the read throughput for each thread count.
+
+Each read counts the rows of the side export inside SQLite, which releases
+the GIL while it works, so reads can run in parallel. Reads that turn many
+rows into Python objects spend most of their time holding the GIL, and don't
+get faster with more threads in one process.
+"""
+
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import func
+
+from apulian.export import side_query
+from apulian.models import bootstrap_readers, bootstrap_writer, Vase, Side, \
+        Image
+from populate import DB_NAME
+
+
+THREADS = '1,2,4,8'
+DURATION = 5.0
+BATCH = 50
+
+
+def read_worker(Session, stop, counts, i):
+    """\
+    Counts the rows of the side export query over and over until `stop` is
+    set. Each query gets a fresh session, so it reads the latest WAL snapshot.
+    """
+    n = 0
+    while not stop.is_set():
+        session = Session()
+        try:
+            (
+                session.query(func.count())
+                .select_from(side_query(session).subquery())
+                .scalar()
+                )
+        finally:
+            Session.remove()
+        n += 1
+    counts[i] = n
+
+
+def write_worker(make_session, stop, counts):
+    """Imports batches of vases, committing after each, until `stop` is set."""
+    n = 0
+    session = make_session()
+    try:
+        while not stop.is_set():
+            for _ in range(BATCH):
+                vase = Vase(fabric='Apulian', form='Krater', subform='Bell',
+                            trendall_ch=99, trendall_no=str(n))
+                vase.sides.append(Side(identifier='A'))
+                vase.sides.append(Side(identifier='B'))
+                vase.images.append(Image(name=str(n)))
+                session.add(vase)
+                n += 1
+            session.commit()
+    finally:
+        session.close()
+    counts['writes'] = n
+
+
+def _dispose(make_session):
+    """Closes all of the connections in the engine behind `make_session`."""
+    session = make_session()
+    try:
+        session.get_bind().dispose()
+    finally:
+        session.close()
+
+
+def copy_db(src, tmp_dir):
+    """\
+    Copies the database into `tmp_dir`, replacing any earlier copy, and
+    switches the copy to WAL before any readers open it. Returns the copy's
+    filename.
+    """
+    db_file = os.path.join(tmp_dir, os.path.basename(src))
+    for filename in [db_file, db_file + '-wal', db_file + '-shm']:
+        if os.path.exists(filename):
+            os.remove(filename)
+    shutil.copyfile(src, db_file)
+    _dispose(bootstrap_writer(db_file))
+    return db_file
+
+
+def run(db_file, n_threads, duration, write):
+    """\
+    Runs `n_threads` readers (and a writer, if `write`) for `duration`
+    seconds. Returns the number of reads and writes per second.
+    """
+    Session = bootstrap_readers(db_file, pool_size=n_threads)
+    make_writer = bootstrap_writer(db_file) if write else None
+    stop = threading.Event()
+    counts = {}
+
+    threads = [
+        threading.Thread(target=read_worker, args=(Session, stop, counts, i))
+        for i in range(n_threads)
+        ]
+    if write:
+        threads.append(threading.Thread(
+            target=write_worker, args=(make_writer, stop, counts),
+            ))
+
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - start
+
+    # Close this round's connections so they don't linger into the next.
+    _dispose(Session)
+    Session.remove()
+    if make_writer is not None:
+        _dispose(make_writer)
+
+    reads = sum(counts.get(i, 0) for i in range(n_threads))
+    return (reads / elapsed, counts.get('writes', 0) / elapsed)
+
+
+def parse_args(argv=None):
+    """Parse command-line arguments."""
+    argv = argv if argv is not None else sys.argv[1:]
+
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument('-d', '--db', dest='db', action='store', default=DB_NAME,
+                   help='The SQLite database to copy and test against. '
+                        'Default = {}.'.format(DB_NAME))
+    p.add_argument('-t', '--threads', dest='threads', action='store',
+                   default=THREADS,
+                   help='A comma-separated list of reader thread counts to '
+                        'test. Default = {}.'.format(THREADS))
+    p.add_argument('-s', '--seconds', dest='seconds', action='store',
+                   default=DURATION, type=float,
+                   help='How long to run each thread count. '
+                        'Default = {}.'.format(DURATION))
+    p.add_argument('--no-write', dest='write', action='store_false',
+                   help="Don't run an import while reading.")
+
+    args = p.parse_args(argv)
+
+    return args
+
+
+def main():
+    """The main entrypoint for this process."""
+    args = parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        print('threads\treads/s\tper thread\twrites/s')
+        for n_threads in [int(n) for n in args.threads.split(',')]:
+            # Each round starts from the same data, without the last round's
+            # imported vases.
+            db_file = copy_db(args.db, tmp_dir)
+            reads, writes = run(db_file, n_threads, args.seconds, args.write)
+            print('{}\t{:.1f}\t{:.1f}\t{:.1f}'.format(
+                n_threads, reads, reads / n_threads, writes,
+                ))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+
+
+"""\
+This checks the field parsers against a golden corpus and times them.
+
+The corpus is every distinct value of the fields each parser reads from the
+shipped CSV files, along with what the parser returned for it. Each run checks
+that the parsers still return the same results, then times each parser over
+its corpus and compares that to a stored baseline. The times are relative to
+a calibration loop run in the same process, so the baseline holds across
+machines. It exits with an error if any output changed or any parser slowed
+down more than the threshold.
+"""
+
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import timeit
+
+from apulian.adapter import RowAdapter
+from apulian.utils import read_csv, take_digits
+
+
+CSV_FILES = [
+    'Apulian_Database.csv',
+    'Apulian_Database_dates.csv',
+    'Apulian_Database_final.csv',
+    ]
+GOLDEN_DIR = 'golden'
+CORPUS_FILE = os.path.join(GOLDEN_DIR, 'parsers.json')
+BASELINE_FILE = os.path.join(GOLDEN_DIR, 'baseline.json')
+THRESHOLD = 0.25
+REPEAT = 60
+SAMPLE_SECONDS = 0.02
+
+
+ADAPTER = RowAdapter()
+
+# The parsers to check, each with the CSV fields it is run on.
+PARSERS = {
+    'scene_type': (
+        lambda value: ADAPTER._parse_scene_type(value, False),
+        ['SCENE_TYPE_A', 'SCENE_TYPE_B'],
+        ),
+    'scene_type_trailing': (
+        lambda value: ADAPTER._parse_scene_type(value, True),
+        ['MUSICAL_SCENE_TYPE_{}', 'SIDE_{}_PERFORMERS',
+         'SIDE_{}_PERFORMER_LOCATION', 'SIDE_{}_PERFORMER_ACTION'],
+        ),
+    'instr_nos': (
+        ADAPTER._parse_instr_nos,
+        ['SIDE_{}_INSTRUMENTS_AND_NUMBERS', 'SIDE_{}_NUMBER_OF_FIGURES'],
+        ),
+    'images': (
+        ADAPTER._parse_images,
+        ['IMAGE_SERIES'],
+        ),
+    'take_digits': (
+        take_digits,
+        ['TRENDALL_ID', 'SIDE_{}_INSTRUMENTS_AND_NUMBERS',
+         'SIDE_{}_NUMBER_OF_FIGURES'],
+        ),
+    }
+
+
+def _field_names(fields):
+    for field in fields:
+        if '{}' in field:
+            yield field.format('A')
+            yield field.format('B')
+        else:
+            yield field
+
+
+def _take_digits_inputs(row):
+    """\
+    `take_digits` doesn't read a field directly, so this pulls out the kinds
+    of strings it sees: the number part of Trendall IDs and the counts in the
+    instrument and figure fields.
+    """
+    _, _, trendall_no = row['TRENDALL_ID'].partition('.')
+    yield trendall_no.strip()
+    for side_id in 'AB':
+        for field in ['SIDE_{}_INSTRUMENTS_AND_NUMBERS',
+                      'SIDE_{}_NUMBER_OF_FIGURES']:
+            for ino in row[field.format(side_id)].split(','):
+                if '_' in ino:
+                    yield ino.split('_')[0]
+
+
+def extract_inputs(csv_files):
+    """Returns the sorted distinct inputs for each parser in the CSV files."""
+    inputs = {name: set() for name in PARSERS}
+    for filename in csv_files:
+        for row in read_csv(filename):
+            for (name, (_, fields)) in PARSERS.items():
+                if name == 'take_digits':
+                    inputs[name].update(_take_digits_inputs(row))
+                else:
+                    inputs[name].update(
+                        row[field] for field in _field_names(fields)
+                        if row.get(field) is not None
+                        )
+    return {name: sorted(values) for (name, values) in inputs.items()}
+
+
+def apply_parser(parser, value):
+    """\
+    Runs the parser on the value and returns the result in the form it's
+    stored in the corpus. Errors are recorded by their type.
+
+    >>> apply_parser(take_digits, '210b')
+    [210, 'b']
+    >>> apply_parser(int, 'b')
+    {'error': 'ValueError'}
+
+    """
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = parser(value)
+    except Exception as exc:
+        return {'error': type(exc).__name__}
+    return json.loads(json.dumps(result))
+
+
+def build_corpus(csv_files):
+    """Builds the golden corpus from the parsers' current output."""
+    corpus = {}
+    for (name, values) in extract_inputs(csv_files).items():
+        parser, _ = PARSERS[name]
+        corpus[name] = [[value, apply_parser(parser, value)]
+                        for value in values]
+    return corpus
+
+
+def check_corpus(corpus):
+    """Returns a list of (parser, input, expected, actual) for each change."""
+    changes = []
+    for (name, cases) in sorted(corpus.items()):
+        parser, _ = PARSERS[name]
+        for (value, expected) in cases:
+            actual = apply_parser(parser, value)
+            if actual != expected:
+                changes.append((name, value, expected, actual))
+    return changes
+
+
+def calibrate(value):
+    """\
+    The reference work each parser is timed against: the kind of string
+    handling the parsers do, without any of their logic.
+    """
+    return [part.strip(' ()').isdigit() for part in value.split(',')]
+
+
+def _sample(func, values, seconds):
+    """Returns the time of one pass of `func` over `values`."""
+    def one_pass():
+        for value in values:
+            try:
+                func(value)
+            except Exception:
+                pass
+
+    timer = timeit.Timer(one_pass)
+    number = max(1, int(seconds / timer.timeit(number=1)))
+    return timer.timeit(number=number) / number
+
+
+def time_parser(parser, values, repeat=REPEAT, seconds=SAMPLE_SECONDS):
+    """\
+    Returns how long the parser takes over all the values, relative to
+    `calibrate` over the same values in the same process. That keeps the
+    number comparable between machines. Each sample of the parser is
+    bracketed by samples of `calibrate`, so both see the same load, and this
+    returns the median ratio of `repeat` of those.
+    """
+    ratios = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            before = _sample(calibrate, values, seconds)
+            parser_time = _sample(parser, values, seconds)
+            after = _sample(calibrate, values, seconds)
+            ratios.append(2 * parser_time / (before + after))
+    return statistics.median(ratios)
+
+
+def time_corpus(corpus, repeat=REPEAT, seconds=SAMPLE_SECONDS):
+    """Returns the relative timing for each parser over its corpus."""
+    return {
+        name: time_parser(PARSERS[name][0],
+                          [value for (value, _) in cases],
+                          repeat, seconds)
+        for (name, cases) in sorted(corpus.items())
+        }
+
+
+def read_json(filename):
+    with open(filename, encoding='utf8') as fin:
+        return json.load(fin)
+
+
+def write_json(filename, data):
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, 'w', encoding='utf8') as fout:
+        json.dump(data, fout, indent=1, sort_keys=True)
+        fout.write('\n')
+
+
+def parse_args(argv=None):
+    """Parse command-line arguments."""
+    argv = argv if argv is not None else sys.argv[1:]
+
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument('--update-corpus', dest='update_corpus',
+                   action='store_true',
+                   help='Rebuild the golden corpus from the CSV files and '
+                        'the parsers as they are now.')
+    p.add_argument('--update-baseline', dest='update_baseline',
+                   action='store_true',
+                   help='Store the timings from this run as the baseline.')
+    p.add_argument('-t', '--threshold', dest='threshold', action='store',
+                   default=THRESHOLD, type=float,
+                   help='How much slower than the baseline, as a fraction, '
+                        'a parser can get. Default = {}.'.format(THRESHOLD))
+    p.add_argument('-r', '--repeat', dest='repeat', action='store',
+                   default=REPEAT, type=int,
+                   help='How many samples to time of each parser, taking '
+                        'the median. Default = {}.'.format(REPEAT))
+
+    args = p.parse_args(argv)
+
+    return args
+
+
+def main():
+    """The main entrypoint for this process."""
+    args = parse_args()
+    failed = False
+
+    if args.update_corpus:
+        write_json(CORPUS_FILE, build_corpus(CSV_FILES))
+        print('Wrote {}'.format(CORPUS_FILE))
+    corpus = read_json(CORPUS_FILE)
+
+    changes = check_corpus(corpus)
+    for (name, value, expected, actual) in changes:
+        print('CHANGED [{}] {!r}: {!r} != {!r}'.format(
+            name, value, expected, actual,
+            ))
+    failed = failed or bool(changes)
+
+    timings = time_corpus(corpus, args.repeat)
+    if changes:
+        print('Not updating {} because outputs changed.'.format(
+            BASELINE_FILE))
+    elif args.update_baseline or not os.path.exists(BASELINE_FILE):
+        write_json(BASELINE_FILE, timings)
+        print('Wrote {}'.format(BASELINE_FILE))
+    baseline = read_json(BASELINE_FILE)
+
+    print('parser\tinputs\ttime\tbaseline\tchange')
+    for (name, relative) in sorted(timings.items()):
+        change = relative / baseline[name] - 1.0
+        slow = change > args.threshold
+        print('{}\t{}\t{:.2f}\t{:.2f}\t{:+.1%}{}'.format(
+            name, len(corpus[name]), relative, baseline[name], change,
+            '\tSLOWER' if slow else '',
+            ))
+        failed = failed or slow
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+
+"""\
+This exports the database as flat records, one per side or one per instrument
+instance, to JSONL or CSV.
+"""
+
+
+import argparse
+import os
+import sys
+
+from apulian.export import CHUNK_SIZE, FORMATS, RECORD_TYPES, export, \
+        open_output
+from apulian.models import bootstrap_readers
+from populate import DB_NAME
+
+
+def parse_args(argv=None):
+    """Parse command-line arguments."""
+    argv = argv if argv is not None else sys.argv[1:]
+
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument('-d', '--db', dest='db', action='store', default=DB_NAME,
+                   help='The SQLite database to read. '
+                        'Default = {}.'.format(DB_NAME))
+    p.add_argument('-r', '--record', dest='record', action='store',
+                   default='side', choices=sorted(RECORD_TYPES),
+                   help='The kind of record to write. Default = side.')
+    p.add_argument('-f', '--format', dest='format', action='store',
+                   default='jsonl', choices=sorted(FORMATS),
+                   help='The output format. Default = jsonl.')
+    p.add_argument('-z', '--gzip', dest='gzip', action='store_true',
+                   help='Gzip the output. This is implied if the output '
+                        'file ends in ".gz".')
+    p.add_argument('-c', '--chunk-size', dest='chunk_size', action='store',
+                   default=CHUNK_SIZE, type=int,
+                   help='The number of rows to fetch from the database at '
+                        'a time. Default = {}.'.format(CHUNK_SIZE))
+    p.add_argument('-o', '--output', dest='output', action='store',
+                   default='-',
+                   help='The file to write to. Default = STDOUT.')
+
+    args = p.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        p.error('Database not found: "{}"'.format(args.db))
+
+    return args
+
+
+def main():
+    """The main entrypoint for this process."""
+    args = parse_args()
+
+    Session = bootstrap_readers(args.db, pool_size=1)
+    session = Session()
+
+    with open_output(args.output, args.gzip) as fout:
+        n = export(session, args.record, args.format, fout, args.chunk_size)
+
+    print('Wrote {} {} records.'.format(n, args.record), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
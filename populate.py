@@ -8,7 +8,7 @@ import os
 import sys
 
 from apulian.adapter import RowAdapter
-from apulian.models import bootstrap
+from apulian.models import bootstrap_writer
 from apulian.utils import read_csv
 
 
@@ -22,12 +22,14 @@ DB_NAME = 'apulian.sqlite'
 def main():
     """The entry point to populating the database. """
     if '-X' in sys.argv or '--clear' in sys.argv:
-        print('Removing {}'.format(DB_NAME))
-        os.remove(DB_NAME)
-
-    make_session = bootstrap(
-        'sqlite:///{}'.format(DB_NAME), echo=True,
-    )
+        # The WAL journal files have to go too, or SQLite will pair them with
+        # the new database.
+        for filename in [DB_NAME, DB_NAME + '-wal', DB_NAME + '-shm']:
+            if os.path.exists(filename):
+                print('Removing {}'.format(filename))
+                os.remove(filename)
+
+    make_session = bootstrap_writer(DB_NAME, echo=True)
     session = make_session()
 
     adapter = RowAdapter()
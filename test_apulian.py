@@ -6,10 +6,14 @@
 import doctest
 
 import apulian.adapter
+import apulian.export
+import apulian.lookup
 import apulian.models
 import apulian.utils
+import bench_parsers
 
 
 if __name__ == '__main__':
-    for m in [apulian.adapter, apulian.models, apulian.utils]:
+    for m in [apulian.adapter, apulian.export, apulian.lookup,
+              apulian.models, apulian.utils, bench_parsers]:
         doctest.testmod(m)